@@ -15,29 +15,510 @@ import os
 import re
 import sys
 import logging
+import mmap
+from datetime import datetime
+from importlib import metadata
+from itertools import chain
 from pathlib import Path
 from numbat import SourcetrailDB
+from numbat.types import EdgeType, NameHierarchy, NodeType, SourceLocationType, SymbolType
+
+# Optional faster JSON backends; fall back to the stdlib json module if missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Without msgspec, inputs above this size are streamed with ijson (if installed)
+# instead of parsed in one go. The file is read in a single pass and each item is
+# converted to a record as soon as it is complete, so only one dict is alive at a
+# time. Walking ijson's events in Python costs load time compared to json.load, in
+# exchange for never holding the whole document as dicts.
+STREAMING_THRESHOLD = 256 * 1024 * 1024
+# Inputs above this size are memory-mapped and decoded in place rather than read into memory
+MMAP_THRESHOLD = 1024 * 1024 * 1024
+
+def define_record(name, fields):
+    """
+    Define a record type for the rows of the parser output. With msgspec this is a
+    msgspec.Struct the JSON is decoded into directly; otherwise a plain __slots__
+    class built from the decoded dicts. Either way fields are read as attributes.
+    """
+    if msgspec is not None:
+        return msgspec.defstruct(name, fields)
+
+    names = tuple(field[0] for field in fields)
+    defaults = {field[0]: field[2] for field in fields if len(field) == 3}
+
+    def __init__(self, **values):
+        for field in names:
+            setattr(self, field, values[field] if field in values else defaults[field])
+
+    return type(name, (), {"__slots__": names, "__init__": __init__})
+
+# Not every Numbat version can record signatures. When it can, they are stored as
+# node hover text through BulkRecorder.record_symbol_signature; when it can't, the
+# "Sig" field is left out of Symbol so the decoder skips those strings instead of
+# building them.
+RECORD_SIGNATURES = hasattr(SourcetrailDB, "record_symbol_signature")
+
+Symbol = define_record("Symbol", [
+    ("ID", int),
+    ("Name", str),
+    ("Kind", str),
+    ("PackagePath", str, ""),
+    ("File", str, ""),
+    ("Line", int, 0),
+    ("Column", int, 0),
+    ("External", bool, False),
+    ("ParentID", int, 0),
+] + ([("Sig", str, "")] if RECORD_SIGNATURES else []))
+
+Reference = define_record("Reference", [
+    ("FromID", int, 0),
+    ("ToID", int, 0),
+    ("File", str, ""),
+    ("Line", int, 0),
+    ("Column", int, 0),
+    ("RefType", str, ""),
+])
+
+Package = define_record("Package", [
+    ("name", str, ""),
+    ("version", str, ""),
+])
+
+if msgspec is not None:
+    ParserOutput = msgspec.defstruct("ParserOutput", [
+        ("symbols", list[Symbol], []),
+        ("references", list[Reference], []),
+        ("packages", list[Package], []),
+    ])
+
+def to_records(rows, record_type):
+    """Convert decoded JSON objects to instances of record_type (only used without msgspec)."""
+    return [record_type(**row) for row in rows]
+
+def decode_json_file(input_path, size, decode):
+    """
+    Call decode on the raw bytes of input_path. Files above MMAP_THRESHOLD are
+    memory-mapped and handed over as a memoryview, which avoids holding a full
+    bytes copy of the file next to the decoded data.
+    """
+    if size > MMAP_THRESHOLD:
+        with open(input_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                memoryview(mapped) as view:
+            return decode(view)
+    return decode(input_path.read_bytes())
+
+def load_json_data(input_path):
+    """
+    Load the symbols, references and packages lists from the parser's JSON output
+    as Symbol, Reference and Package records. With msgspec the JSON is decoded
+    straight into the records, which is the fastest option at any size. Without it,
+    very large inputs are streamed item by item with ijson so the whole document
+    is never held as dicts at once; otherwise orjson (or the stdlib json module) is
+    used and the dicts are converted.
+    """
+    size = input_path.stat().st_size
+    if msgspec is not None:
+        data = decode_json_file(input_path, size, lambda raw: msgspec.json.decode(raw, type=ParserOutput))
+        return data.symbols, data.references, data.packages
+
+    if ijson is not None and size > STREAMING_THRESHOLD:
+        record_types = {"symbols.item": Symbol, "references.item": Reference, "packages.item": Package}
+        lists = {item_prefix: [] for item_prefix in record_types}
+        builder = None
+        with open(input_path, "rb") as f:
+            for prefix, event, value in ijson.parse(f):
+                if builder is not None:
+                    builder.event(event, value)
+                    if event == "end_map" and prefix == item_prefix:
+                        records.append(record_type(**builder.value))
+                        builder = None
+                elif event == "start_map" and prefix in record_types:
+                    item_prefix = prefix
+                    record_type = record_types[prefix]
+                    records = lists[prefix]
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+        return lists["symbols.item"], lists["references.item"], lists["packages.item"]
+
+    if orjson is not None:
+        data = decode_json_file(input_path, size, orjson.loads)
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    return (
+        to_records(data.get("symbols", []), Symbol),
+        to_records(data.get("references", []), Reference),
+        to_records(data.get("packages", []), Package),
+    )
+
+# Edge type value recorded for each reference type; anything else is a plain usage
+REF_EDGE_TYPES = {
+    "call": EdgeType.CALL.value,
+    "extends_": EdgeType.INHERITANCE.value,
+    "implements_": EdgeType.INHERITANCE.value,
+    "with_": EdgeType.INHERITANCE.value,
+    "override": EdgeType.OVERRIDE.value,
+    "import": EdgeType.INCLUDE.value,
+}
+DEFAULT_REF_EDGE_TYPE = EdgeType.USAGE.value
+
+# Order in which symbol kinds are recorded, so parents exist before their members.
+# Unknown kinds go last.
+KIND_PRIORITY = {
+    "package": 0,
+    "library": 1,
+    "class_": 2,
+    "mixin": 2,
+    "extension": 2,
+    "enum_": 2,
+    "field": 3,
+    "function": 4,
+    "method": 4,
+    "constructor": 4,
+    "variable": 5,
+    "parameter": 6,
+}
+UNKNOWN_KIND_PRIORITY = 7
+
+def begin_bulk_load(db):
+    """
+    Tune Numbat's underlying sqlite3 connection for a one-shot bulk load and open a
+    single explicit transaction. Everything recorded afterwards is committed at once
+    by db.commit() at the end of main().
+    """
+    conn = db.database
+    # The output DB is rebuilt from scratch on every run, so a crash-safe on-disk
+    # journal buys nothing; keep it in memory and skip the per-commit fsyncs.
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256MB
+    conn.execute("BEGIN IMMEDIATE")
+
+# BulkRecorder writes Numbat's tables directly and relies on its name_cache and
+# database attributes, so only run against Numbat versions it was checked with.
+SUPPORTED_NUMBAT_VERSIONS = ("0.2.2",)
+
+def get_numbat_version():
+    """Return the installed Numbat version, or None if it cannot be determined."""
+    try:
+        return metadata.version("numbat")
+    except metadata.PackageNotFoundError:
+        return None
+
+# Pieces of Numbat's serialized node names (see numbat.types.NameHierarchy). A child's
+# name is its parent's name + NAME_SEPARATOR + name + NAME_ELEMENT_END.
+NAME_META = NameHierarchy.META_DELIMITER
+NAME_SEPARATOR = NameHierarchy.NAME_DELIMITER
+NAME_ELEMENT_END = NameHierarchy.PART_DELIMITER + NameHierarchy.SIGNATURE_DELIMITER
 
-def get_or_create_package_namespace(package_path, module_map, db, package_map):
+class BulkRecorder:
+    """
+    Buffers files, symbol nodes, symbol locations and references and writes them to
+    the Numbat database with executemany. Mirrors SourcetrailDB.record_<kind>: same
+    serialized names, element ids, MEMBER edges and definition kinds, but without
+    Numbat's per-call SELECT/INSERT/UPDATE round trips. Call flush() before
+    recording anything else through db directly.
+    """
+
+    # Numbat enum values, resolved once: Enum.value is a Python-level property and
+    # would otherwise be evaluated several times for every row
+    NODE_SYMBOL = NodeType.NODE_SYMBOL.value
+    NODE_NAMESPACE = NodeType.NODE_NAMESPACE.value
+    NODE_CLASS = NodeType.NODE_CLASS.value
+    NODE_INTERFACE = NodeType.NODE_INTERFACE.value
+    NODE_FIELD = NodeType.NODE_FIELD.value
+    NODE_FUNCTION = NodeType.NODE_FUNCTION.value
+    NODE_METHOD = NodeType.NODE_METHOD.value
+    NODE_GLOBAL_VARIABLE = NodeType.NODE_GLOBAL_VARIABLE.value
+    NODE_FILE = NodeType.NODE_FILE.value
+    EDGE_MEMBER = EdgeType.MEMBER.value
+    EXPLICIT = SymbolType.EXPLICIT.value
+    LOCATION_TOKEN = SourceLocationType.TOKEN.value
+
+    def __init__(self, db):
+        self.conn = db.database
+        # Shared with Numbat so both sides agree on which serialized names exist
+        self.name_cache = db.name_cache
+        self.first_id = None
+        self.next_id = None
+        self.names = {}     # node id -> serialized name
+        self.chains = {}    # node id -> ids of the node and its ancestors, root first
+        self.node_rows = {}     # new node id -> [type, serialized name, hover text]
+        self.type_updates = {}  # existing node id -> type
+        self.hover_updates = {}  # existing node id -> hover text
+        self.edge_rows = []
+        self.reference_ids = {}  # (edge type, source id, dest id) -> edge id
+        self.symbol_rows = []
+        self.symbol_ids = {row[0] for row in self.conn.execute("SELECT id FROM symbol")}
+        self.next_location_id = None
+        self.location_rows = []
+        self.occurrence_rows = []
+        self.file_rows = []
+        self.file_content_rows = []
+
+    def _new_element(self):
+        if self.next_id is None:
+            self.first_id = self.next_id = self.conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM element").fetchone()[0]
+        elem_id = self.next_id
+        self.next_id += 1
+        return elem_id
+
+    def _add_if_not_existing(self, serialized_name, node_type=NODE_SYMBOL):
+        node_id = self.name_cache.get(serialized_name)
+        if node_id is None:
+            node_id = self._new_element()
+            self.node_rows[node_id] = [node_type, serialized_name, ""]
+            self.name_cache[serialized_name] = node_id
+        return node_id
+
+    def _chain(self, node_id):
+        chain = self.chains.get(node_id)
+        if chain is None:
+            # A node recorded through Numbat before this recorder was created
+            row = self.conn.execute("SELECT serialized_name FROM node WHERE id = ?", (node_id,)).fetchone()
+            if row is None:
+                return None
+            parts = row[0].split(NAME_SEPARATOR)
+            chain = tuple(
+                self._add_if_not_existing(NAME_SEPARATOR.join(parts[:i + 1]))
+                for i in range(len(parts))
+            )
+            self.names[node_id] = row[0]
+            self.chains[node_id] = chain
+        return chain
+
+    def _record(self, name, parent_id, is_indexed, delimiter, node_type):
+        if parent_id:
+            parent_chain = self._chain(parent_id)
+            if parent_chain is None:
+                return None
+            serialized_name = f"{self.names[parent_id]}{NAME_SEPARATOR}{name}{NAME_ELEMENT_END}"
+        else:
+            parent_chain = ()
+            serialized_name = f"{delimiter}{NAME_META}{name}{NAME_ELEMENT_END}"
+
+        node_id = self._add_if_not_existing(serialized_name)
+        chain = parent_chain + (node_id,)
+        self.names[node_id] = serialized_name
+        self.chains[node_id] = chain
+
+        # Like Numbat, add a MEMBER edge for every link of the hierarchy on each call
+        for i in range(1, len(chain)):
+            self.edge_rows.append((self._new_element(), self.EDGE_MEMBER, chain[i - 1], chain[i]))
+
+        if node_id in self.node_rows:
+            self.node_rows[node_id][0] = node_type
+        else:
+            self.type_updates[node_id] = node_type
+
+        if is_indexed and node_id not in self.symbol_ids:
+            self.symbol_ids.add(node_id)
+            self.symbol_rows.append((node_id, self.EXPLICIT))
+        return node_id
+
+    def record_namespace(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_NAMESPACE)
+
+    def record_class(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_CLASS)
+
+    def record_interface(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_INTERFACE)
+
+    def record_field(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_FIELD)
+
+    def record_function(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_FUNCTION)
+
+    def record_method(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_METHOD)
+
+    def record_global_variable(self, name, parent_id=None, is_indexed=True, delimiter=NameHierarchy.NAME_DELIMITER_CXX):
+        return self._record(name, parent_id, is_indexed, delimiter, self.NODE_GLOBAL_VARIABLE)
+
+    def record_reference(self, source_id, dest_id, edge_type):
+        """
+        Record a reference edge of the given EdgeType value between two nodes. Like
+        Sourcetrail's own indexer, a repeated (type, source, dest) triple reuses the
+        existing edge instead of adding a duplicate.
+        """
+        key = (edge_type, source_id, dest_id)
+        edge_id = self.reference_ids.get(key)
+        if edge_id is None:
+            edge_id = self._new_element()
+            self.reference_ids[key] = edge_id
+            self.edge_rows.append((edge_id,) + key)
+        return edge_id
+
+    def record_file(self, path, language):
+        """
+        Record an indexed source file and its language, like SourcetrailDB.record_file
+        followed by record_file_language. A file that was already recorded (e.g. seen
+        through another relative path) keeps its existing id.
+        """
+        if not path.is_file():
+            raise FileNotFoundError(path)
+        path = str(path.absolute())
+        serialized_name = f"{NameHierarchy.NAME_DELIMITER_FILE}{NAME_META}{path}{NAME_ELEMENT_END}"
+        file_id = self.name_cache.get(serialized_name)
+        if file_id is not None:
+            return file_id
+
+        file_id = self._add_if_not_existing(serialized_name, self.NODE_FILE)
+        modification_time = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+        with open(path, "r") as f:
+            lines = f.readlines()
+        self.file_rows.append((file_id, path, language, modification_time, True, True, len(lines)))
+        self.file_content_rows.append((file_id, "".join(lines)))
+        return file_id
+
+    def record_symbol_signature(self, symbol_id, signature):
+        """Set the hover text of a symbol's node, like SourcetrailDB.record_symbol_signature."""
+        if symbol_id is None:
+            raise ValueError("the symbol has no recorded node")
+        if symbol_id in self.node_rows:
+            self.node_rows[symbol_id][2] = signature
+        else:
+            self.hover_updates[symbol_id] = signature
+
+    def record_symbol_location(self, symbol_id, file_id, start_line, start_column, end_line, end_column):
+        """Record a TOKEN source location for a symbol, like SourcetrailDB.record_symbol_location."""
+        if symbol_id is None:
+            # Numbat would leave an orphan source_location row behind in this case
+            raise ValueError("the symbol has no recorded node")
+        if self.next_location_id is None:
+            self.next_location_id = self.conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM source_location").fetchone()[0]
+        location_id = self.next_location_id
+        self.next_location_id += 1
+        self.location_rows.append(
+            (location_id, file_id, start_line, start_column, end_line, end_column, self.LOCATION_TOKEN)
+        )
+        self.occurrence_rows.append((symbol_id, location_id))
+
+    def flush(self):
+        """Write all buffered rows in one executemany per table."""
+        if self.next_id is not None:
+            self.conn.executemany(
+                "INSERT INTO element(id) VALUES (?)",
+                ((elem_id,) for elem_id in range(self.first_id, self.next_id))
+            )
+        self.conn.executemany(
+            "INSERT INTO node(id, type, serialized_name, hover_display) VALUES (?, ?, ?, ?)",
+            ((node_id,) + tuple(row) for node_id, row in self.node_rows.items())
+        )
+        self.conn.executemany(
+            "UPDATE node SET type = ? WHERE id = ?",
+            ((node_type, node_id) for node_id, node_type in self.type_updates.items())
+        )
+        self.conn.executemany(
+            "UPDATE node SET hover_display = ? WHERE id = ?",
+            ((hover, node_id) for node_id, hover in self.hover_updates.items())
+        )
+        self.conn.executemany(
+            "INSERT INTO edge(id, type, source_node_id, target_node_id, hover_display) VALUES (?, ?, ?, ?, '')",
+            self.edge_rows
+        )
+        self.conn.executemany("INSERT INTO symbol(id, definition_kind) VALUES (?, ?)", self.symbol_rows)
+        self.conn.executemany(
+            "INSERT INTO file(id, path, language, modification_time, indexed, complete, line_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self.file_rows
+        )
+        self.conn.executemany("INSERT INTO filecontent(id, content) VALUES (?, ?)", self.file_content_rows)
+        self.conn.executemany(
+            "INSERT INTO source_location(id, file_node_id, start_line, start_column, end_line, end_column, type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self.location_rows
+        )
+        self.conn.executemany(
+            "INSERT INTO occurrence(element_id, source_location_id) VALUES (?, ?)",
+            self.occurrence_rows
+        )
+
+        # Numbat may allocate elements after this point, so re-read the next id lazily
+        self.first_id = self.next_id = None
+        self.next_location_id = None
+        self.node_rows = {}
+        self.type_updates = {}
+        self.hover_updates = {}
+        self.edge_rows = []
+        self.symbol_rows = []
+        self.location_rows = []
+        self.occurrence_rows = []
+        self.file_rows = []
+        self.file_content_rows = []
+
+def resolve_file_path(fpath, resolved_dir_cache):
+    """
+    Equivalent of Path(fpath).resolve() that resolves each directory only once.
+    Files sharing a directory reuse the cached result instead of re-walking every
+    path component with readlink/stat.
+    """
+    dirname, basename = os.path.split(fpath)
+    resolved_dir = resolved_dir_cache.get(dirname)
+    if resolved_dir is None:
+        resolved_dir = os.path.realpath(dirname)
+        resolved_dir_cache[dirname] = resolved_dir
+    abs_path = os.path.join(resolved_dir, basename)
+    # The file itself may still be a symlink
+    if os.path.islink(abs_path):
+        abs_path = os.path.realpath(abs_path)
+    return Path(abs_path)
+
+def build_module_trie(module_map):
+    """
+    Build a trie over the module paths, keyed by "/"-separated path segment.
+    A node that terminates a module path stores the module name under the None key.
+    """
+    module_trie = {}
+    for mp in module_map:
+        # skip the "EXTERNAL" sentinel if present
+        if mp == "EXTERNAL":
+            continue
+        node = module_trie
+        for segment in mp.split("/"):
+            node = node.setdefault(segment, {})
+        node[None] = mp
+    return module_trie
+
+def get_or_create_package_namespace(package_path, module_map, module_trie, db, package_map, namespace_map):
     """
     Create or retrieve a nested namespace node for the given package_path under the appropriate module.
     If package_path matches or starts with a known module path, we nest under that module.
     Otherwise, we place it under an EXTERNAL namespace for third-party or unknown packages.
+    package_map caches the result per package_path; namespace_map holds every namespace
+    created so far, keyed by its tuple of interned path segments.
     """
     if package_path in package_map:
         return package_map[package_path]
 
-    # Find the module that best matches this package path (longest prefix match)
+    # Find the module that best matches this package path (deepest module in the trie)
     best_module = None
-    best_len = 0
-    for mp in module_map:
-        # skip the "EXTERNAL" sentinel if present
-        if mp == "EXTERNAL":
-            continue
-        if package_path == mp or package_path.startswith(mp + "/"):
-            if len(mp) > best_len:
-                best_len = len(mp)
-                best_module = mp
+    node = module_trie
+    for segment in package_path.split("/"):
+        node = node.get(segment)
+        if node is None:
+            break
+        best_module = node.get(None, best_module)
 
     # If no suitable module found, place under EXTERNAL
     if best_module is None:
@@ -50,36 +531,49 @@ def get_or_create_package_namespace(package_path, module_map, db, package_map):
             )
             module_map["EXTERNAL"] = external_id
         parent_id = module_map["EXTERNAL"]
+        key = ()
         parts = package_path.split("/")
     else:
         parent_id = module_map[best_module]
+        key = tuple(map(sys.intern, best_module.split("/")))
         remainder = package_path[len(best_module):].lstrip("/")
         parts = remainder.split("/") if remainder else []
 
     current_parent = parent_id
-    current_path = best_module
 
-    # Create nested namespaces for each path segment
+    # Create nested namespaces for each path segment. Interned segments are shared
+    # by all the keys below a given namespace.
     for p in parts:
-        new_path = current_path + "/" + p if current_path != "EXTERNAL" else p
-        if new_path in package_map:
-            current_parent = package_map[new_path]
-            current_path = new_path
-            continue
-        else:
+        p = sys.intern(p)
+        key += (p,)
+        ns_id = namespace_map.get(key)
+        if ns_id is None:
             ns_id = db.record_namespace(
                 name=p,
                 parent_id=current_parent,
                 is_indexed=True,
                 delimiter="/"
             )
-            package_map[new_path] = ns_id
-            current_parent = ns_id
-            current_path = new_path
+            namespace_map[key] = ns_id
+        current_parent = ns_id
 
     package_map[package_path] = current_parent
     return current_parent
 
+def log_failures(logger, what, failures):
+    """
+    Log one warning summarizing the (symbol name, exception) pairs collected in a
+    loop, instead of formatting a message per failure. Each failure is still logged
+    at debug level for --verbose runs.
+    """
+    if not failures:
+        return
+    name, error = failures[0]
+    logger.warning("Failed to record %s for %d symbols (first: %s: %s)", what, len(failures), name, error)
+    if logger.isEnabledFor(logging.DEBUG):
+        for name, error in failures:
+            logger.debug("Failed to record %s for %s: %s", what, name, error)
+
 def main():
     parser = argparse.ArgumentParser(description="Generate a Sourcetrail DB from DartSrcCtrl JSON output using Numbat.")
     parser.add_argument("-i", "--input", required=True, help="Path to the JSON file with symbols and references.")
@@ -99,39 +593,48 @@ def main():
     )
     logger = logging.getLogger("generate_db")
 
-    # Check if output directory exists and is writable
-    output_dir = output_path.parent
-    if not output_dir.exists():
-        logger.warning(f"Output directory does not exist: {output_dir}")
-        try:
-            output_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created output directory: {output_dir}")
-        except Exception as e:
-            logger.error(f"Failed to create output directory: {e}")
-            exit(1)
-
-    if not os.access(output_dir, os.W_OK):
-        logger.error(f"Output directory is not writable: {output_dir}")
-        exit(1)
-
-    if not input_path.exists():
-        logger.error(f"Input file does not exist: {input_path}")
+    numbat_version = get_numbat_version()
+    if numbat_version not in SUPPORTED_NUMBAT_VERSIONS:
+        logger.error(
+            f"Unsupported Numbat version {numbat_version or 'unknown'}; "
+            f"supported versions: {', '.join(SUPPORTED_NUMBAT_VERSIONS)}"
+        )
         exit(1)
 
     if output_path.suffix.lower() != ".srctrldb":
         logger.error(f"Output file must have .srctrldb extension: {output_path}")
         exit(1)
 
+    # Make sure the output directory exists and is writable by trying it directly
+    output_dir = output_path.parent
+    try:
+        output_dir.mkdir(parents=True)
+        logger.info(f"Created output directory: {output_dir}")
+    except FileExistsError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to create output directory: {e}")
+        exit(1)
+
+    try:
+        with open(output_path, "xb"):
+            pass
+        output_path.unlink()
+    except FileExistsError:
+        # An existing database is replaced when it is opened below
+        pass
+    except OSError as e:
+        logger.error(f"Output directory is not writable: {output_dir} ({e})")
+        exit(1)
+
     # Load JSON data
     try:
-        with open(input_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        symbols = data.get("symbols", [])
-        references = data.get("references", [])
-        packages = data.get("packages", [])
+        symbols, references, packages = load_json_data(input_path)
         
         logger.info(f"Loaded {len(symbols)} symbols, {len(references)} references, and {len(packages)} packages from {input_path}")
+    except FileNotFoundError:
+        logger.error(f"Input file does not exist: {input_path}")
+        exit(1)
     except Exception as e:
         logger.error(f"Failed to load JSON data: {e}")
         exit(1)
@@ -139,6 +642,7 @@ def main():
     # Open (and clear) the Sourcetrail DB
     try:
         db = SourcetrailDB.open(output_path, clear=True)
+        begin_bulk_load(db)
         logger.info(f"Opened Sourcetrail database at {output_path}")
     except Exception as e:
         logger.error(f"Failed to open Sourcetrail DB: {e}")
@@ -148,8 +652,8 @@ def main():
     # The first entry in 'packages' should be the main package; mark it as indexed.
     module_map = {}
     for idx, m in enumerate(packages):
-        pkg_name = m.get("name", "")
-        pkg_version = m.get("version", "")
+        pkg_name = m.name
+        pkg_version = m.version
         if pkg_name:
             # Combine name & version for the node name
             full_name = pkg_name
@@ -166,73 +670,82 @@ def main():
             )
             module_map[pkg_name] = mod_id
 
-    # STEP 1: Gather unique file paths and record them with language "dart"
-    file_path_map = {}
-    unique_files = set()
+    module_trie = build_module_trie(module_map)
 
-    # Collect files from symbols
-    for sym in symbols:
-        file_path = sym.get("File", "")
-        if file_path:
-            unique_files.add(file_path)
+    # Files, symbol nodes (and the package namespaces created on the way), locations
+    # and references are buffered and written in bulk once STEP 3 is done
+    recorder = BulkRecorder(db)
 
-    # Collect files from references
-    for ref in references:
-        file_path = ref.get("File", "")
-        if file_path:
-            unique_files.add(file_path)
-
-    for fpath in unique_files:
-        abs_path = Path(fpath).resolve()
-        file_id = db.record_file(abs_path)
-        # For best results, set language to "dart"
-        db.record_file_language(file_id, "dart")
-        file_path_map[fpath] = file_id
-
-    # A map from our Symbol.ID to the recorded Numbat symbol ID
-    symbol_id_map = {}
+    # STEP 1: Gather unique file paths and record them with language "dart"
+    unique_files = {f for f in (d.File for d in chain(symbols, references)) if f}
+
+    resolved_dir_cache = {}
+    abs_paths = [resolve_file_path(fpath, resolved_dir_cache) for fpath in unique_files]
+    # For best results, set language to "dart"
+    file_ids = [recorder.record_file(abs_path, "dart") for abs_path in abs_paths]
+    file_path_map = dict(zip(unique_files, file_ids))
+
+    # A map from our Symbol.ID to the recorded Numbat symbol ID (None if unmapped).
+    # The parser numbers symbols 1, 2, 3, ... so a list indexed by ID is enough.
+    max_id = max((sym.ID for sym in symbols), default=0)
+    symbol_id_map = [None] * (max_id + 1)
     # We'll store package namespace IDs here
     package_map = {}
+    namespace_map = {}
 
     # STEP 2: Insert all symbols.
     # Sort symbols so that the parent type (class/mixin) is recorded before methods.
-    def kind_priority(k):
-        priority_map = {
-            "package": 0,
-            "library": 1,
-            "class_": 2,
-            "mixin": 2,
-            "extension": 2,
-            "enum_": 2,
-            "field": 3,
-            "function": 4,
-            "method": 4,
-            "constructor": 4,
-            "variable": 5,
-            "parameter": 6,
-        }
-        return priority_map.get(k, 7)
-
-    symbols.sort(key=lambda s: kind_priority(s["Kind"]))
+    # There are only a handful of priorities, so a stable counting sort into buckets is enough.
+    buckets = [[] for _ in range(max(*KIND_PRIORITY.values(), UNKNOWN_KIND_PRIORITY) + 1)]
+    for sym in symbols:
+        buckets[KIND_PRIORITY.get(sym.Kind, UNKNOWN_KIND_PRIORITY)].append(sym)
+    symbols = list(chain.from_iterable(buckets))
+
+    # How each symbol kind is recorded; "library" and unknown kinds are handled in the loop
+    recorders = {
+        "class_": recorder.record_class,
+        # Mixins are similar to interfaces in Sourcetrail
+        "mixin": recorder.record_interface,
+        # Extensions are recorded as namespaces
+        "extension": recorder.record_namespace,
+        # Enums are recorded as classes
+        "enum_": recorder.record_class,
+        "field": recorder.record_field,
+        "function": recorder.record_function,
+        "method": recorder.record_method,
+        "constructor": recorder.record_method,
+        # Use global_variable instead of variable
+        "variable": recorder.record_global_variable,
+    }
+
+    # Bound methods used on every iteration, looked up once
+    record_namespace = recorder.record_namespace
+    record_symbol_location = recorder.record_symbol_location
+    record_symbol_signature = recorder.record_symbol_signature if RECORD_SIGNATURES else None
+    if record_symbol_signature is None:
+        logger.debug("Skipping signatures: record_symbol_signature method not available")
+
+    # Failures inside the loop are collected and logged once afterwards
+    location_failures = []
+    signature_failures = []
 
     for sym in symbols:
-        sym_id = sym["ID"]
-        sym_name = sym["Name"]
-        sym_kind = sym["Kind"]
-        package_path = sym.get("PackagePath", "")
-        hover_display = sym.get("Sig", "")
-        indexed = not sym.get("External", False)
+        sym_id = sym.ID
+        sym_name = sym.Name
+        sym_kind = sym.Kind
+        package_path = sym.PackagePath
+        indexed = not sym.External
 
         # Identify (or create) the package namespace that owns this symbol
         pkg_parent_id = None
         if package_path:
-            pkg_parent_id = get_or_create_package_namespace(package_path, module_map, db, package_map)
+            pkg_parent_id = get_or_create_package_namespace(package_path, module_map, module_trie, recorder, package_map, namespace_map)
 
         # If the parser assigned a ParentID, we try that first.
         parent_id = pkg_parent_id
-        stored_parent_id = sym.get("ParentID", 0)
-        if stored_parent_id != 0:
-            mapped_parent_id = symbol_id_map.get(stored_parent_id)
+        stored_parent_id = sym.ParentID
+        if 0 < stored_parent_id <= max_id:
+            mapped_parent_id = symbol_id_map[stored_parent_id]
             if mapped_parent_id is not None:
                 parent_id = mapped_parent_id
 
@@ -240,168 +753,78 @@ def main():
         if sym_kind == "library":
             # The library itself maps to the namespace
             recorded_id = pkg_parent_id
-        elif sym_kind == "class_":
-            recorded_id = db.record_class(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "mixin":
-            # Mixins are similar to interfaces in Sourcetrail
-            recorded_id = db.record_interface(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "extension":
-            # Extensions are recorded as namespaces
-            recorded_id = db.record_namespace(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "enum_":
-            # Enums are recorded as classes
-            recorded_id = db.record_class(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "field":
-            recorded_id = db.record_field(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "function":
-            recorded_id = db.record_function(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "method":
-            recorded_id = db.record_method(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "constructor":
-            recorded_id = db.record_method(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
-        elif sym_kind == "variable":
-            # Use global_variable instead of variable
-            recorded_id = db.record_global_variable(
-                name=sym_name,
-                parent_id=parent_id,
-                is_indexed=indexed
-            )
         else:
             # Default to namespace for unknown types
-            recorded_id = db.record_namespace(
+            record = recorders.get(sym_kind, record_namespace)
+            recorded_id = record(
                 name=sym_name,
                 parent_id=parent_id,
                 is_indexed=indexed
             )
 
         # Store the mapping from our ID to Numbat's ID
-        symbol_id_map[sym_id] = recorded_id
+        if sym_id > 0:
+            symbol_id_map[sym_id] = recorded_id
 
         # Record the symbol location in the file
-        file_path = sym.get("File", "")
-        if file_path and file_path in file_path_map:
-            file_id = file_path_map[file_path]
-            line = sym.get("Line", 0)
+        file_id = file_path_map.get(sym.File)
+        if file_id is not None:
+            line = sym.Line
             if line > 0:  # Sourcetrail uses 1-based line numbers
-                # Calculate end column based on symbol name length
-                name_length = len(sym_name) if sym_name else 1
-                
+                # End column from the symbol name length; unnamed symbols
+                # (e.g. unnamed constructors) still get a 1-column range
+                column = sym.Column
+                end_column = column + (len(sym_name) or 1)
+
                 try:
-                    db.record_symbol_location(
+                    record_symbol_location(
                         symbol_id=recorded_id,
                         file_id=file_id,
                         start_line=line,
-                        start_column=sym.get("Column", 0),
+                        start_column=column,
                         end_line=line,
-                        end_column=sym.get("Column", 0) + name_length
+                        end_column=end_column
                     )
                 except Exception as e:
-                    logger.warning(f"Failed to record symbol location for {sym_name}: {e}")
+                    location_failures.append((sym_name, e))
 
         # Add signature/hover text if available
-        if hover_display:
+        if record_symbol_signature is not None and sym.Sig:
             try:
-                # Try to record signature if method exists
-                if hasattr(db, 'record_symbol_signature'):
-                    db.record_symbol_signature(
-                        symbol_id=recorded_id,
-                        signature=hover_display
-                    )
-                else:
-                    logger.debug(f"Skipping signature for {sym_name}: record_symbol_signature method not available")
+                record_symbol_signature(
+                    symbol_id=recorded_id,
+                    signature=sym.Sig
+                )
             except Exception as e:
-                logger.warning(f"Failed to record symbol signature for {sym_name}: {e}")
+                signature_failures.append((sym_name, e))
 
-    # STEP 3: Insert all references
+    log_failures(logger, "symbol location", location_failures)
+    log_failures(logger, "symbol signature", signature_failures)
+
+    # STEP 3: Insert all references, each distinct edge once
     for ref in references:
-        from_id = ref.get("FromID", 0)
-        to_id = ref.get("ToID", 0)
-        ref_type = ref.get("RefType", "")
+        from_id = ref.FromID
+        to_id = ref.ToID
+        ref_type = ref.RefType
         
         # Skip if we don't have valid IDs
-        if from_id == 0 or to_id == 0:
+        if not (0 < from_id <= max_id and 0 < to_id <= max_id):
             continue
             
         # Map our IDs to Numbat IDs
-        from_numbat_id = symbol_id_map.get(from_id)
-        to_numbat_id = symbol_id_map.get(to_id)
+        from_numbat_id = symbol_id_map[from_id]
+        to_numbat_id = symbol_id_map[to_id]
         
         if from_numbat_id is None or to_numbat_id is None:
             continue
-            
-        # We don't need to determine edge_type anymore since we're using specific methods
-        # for each reference type directly in the code below
-            
-        # Record the reference based on its type
-        file_id = file_path_map.get(ref.get("File", ""), 0)
-        line = ref.get("Line", 0)
-        column = ref.get("Column", 0)
-        
-        try:
-            # Use the appropriate reference recording method based on reference type
-            if ref_type == "call":
-                db.record_ref_call(
-                    source_id=from_numbat_id,
-                    dest_id=to_numbat_id
-                )
-            elif ref_type == "extends_" or ref_type == "implements_" or ref_type == "with_":
-                db.record_ref_inheritance(
-                    source_id=from_numbat_id,
-                    dest_id=to_numbat_id
-                )
-            elif ref_type == "override":
-                db.record_ref_override(
-                    source_id=from_numbat_id,
-                    dest_id=to_numbat_id
-                )
-            elif ref_type == "import":
-                db.record_ref_include(
-                    source_id=from_numbat_id,
-                    dest_id=to_numbat_id
-                )
-            else:
-                # Default to usage for other reference types
-                db.record_ref_usage(
-                    source_id=from_numbat_id,
-                    dest_id=to_numbat_id
-                )
-        except Exception as e:
-            logger.warning(f"Failed to record reference from {from_id} to {to_id}: {e}")
-        
+
+        # Record the reference based on its type, defaulting to usage
+        edge_type = REF_EDGE_TYPES.get(ref_type, DEFAULT_REF_EDGE_TYPE)
+        recorder.record_reference(from_numbat_id, to_numbat_id, edge_type)
+
     try:
-        # Commit and close the database
+        # Write the buffered rows, then commit and close the database
+        recorder.flush()
         db.commit()
         logger.info(f"Successfully committed changes to the database")
         db.close()
@@ -409,7 +832,7 @@ def main():
         logger.info(f"Processed {len(symbols)} symbols and {len(references)} references")
         return True
     except Exception as e:
-        logger.error(f"Failed to commit or close the database: {e}")
+        logger.error(f"Failed to write, commit or close the database: {e}")
         return False
 
 if __name__ == "__main__":